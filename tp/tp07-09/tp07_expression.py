@@ -0,0 +1,220 @@
+import ast
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from tp07_fraction import Fraction
+
+# Intermediate results are kept as unreduced (numerator, denominator) pairs and
+# only reduced once, when the final Fraction is built. Pairs growing beyond
+# this many bits are reduced on the way to keep big-int arithmetic cheap.
+REDUCE_BITS = 512
+PARALLEL_THRESHOLD = 10000
+
+
+def _trim(num, den):
+    if den.bit_length() > REDUCE_BITS:
+        d = math.gcd(num, den)
+        return num // d, den // d
+    return num, den
+
+
+def _add(a, b):
+    if a[1] == b[1]:
+        return _trim(a[0] + b[0], a[1])
+    return _trim(a[0] * b[1] + b[0] * a[1], a[1] * b[1])
+
+
+def _sub(a, b):
+    if a[1] == b[1]:
+        return _trim(a[0] - b[0], a[1])
+    return _trim(a[0] * b[1] - b[0] * a[1], a[1] * b[1])
+
+
+def _mul(a, b):
+    return _trim(a[0] * b[0], a[1] * b[1])
+
+
+def _div(a, b):
+    if not b[0]:
+        raise ValueError("You cannot divide a Fraction by 0")
+    return _trim(a[0] * b[1], a[1] * b[0])
+
+
+def _pow(a, b):
+    if b[0] % b[1]:
+        raise TypeError("You can only use Fraction's __pow__ operator with an int or a Fraction representing an int")
+    exponent = b[0] // b[1]
+    if exponent >= 0:
+        return _trim(a[0] ** exponent, a[1] ** exponent)
+    if not a[0]:
+        raise ValueError("Denominator cannot be zero")
+    return _trim(a[1] ** -exponent, a[0] ** -exponent)
+
+
+def _neg(a, b):
+    return -a[0], a[1]
+
+
+OPERATIONS = {"add": _add, "sub": _sub, "mul": _mul, "div": _div, "pow": _pow, "neg": _neg}
+COMMUTATIVE = {"add", "mul"}
+AST_OPERATORS = {ast.Add: "add", ast.Sub: "sub", ast.Mult: "mul", ast.Div: "div", ast.Pow: "pow"}
+
+
+def _as_pair(value):
+    if isinstance(value, Fraction):
+        return value.numerator, value.denominator
+    if isinstance(value, int):
+        return value, 1
+    raise TypeError("Expression variables can only be bound to a Fraction or an int")
+
+
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Expression evaluated by a pool worker, sent once per worker rather than once per chunk
+_worker_expression = None
+
+
+def _init_worker(expression):
+    global _worker_expression
+    _worker_expression = expression
+
+
+def _evaluate_chunk(chunk):
+    return [_worker_expression.evaluate(bindings) for bindings in chunk]
+
+
+class Expression:
+    """Rational expression compiled once into a reusable evaluation plan
+
+    The source is parsed with the usual Python precedence rules (``1/2 ** 3`` is 1/8).
+    Constant subexpressions are folded at compile time and identical subexpressions
+    are computed only once per evaluation.
+    """
+
+    def __init__(self, source: str):
+        """Parse and compile an expression made of ints, variables, + - * / ** and parentheses
+
+        PRE : None (syntax is verified while compiling)
+        POST : the expression is compiled, self.variables holds the names it depends on
+        RAISES : SyntaxError if source cannot be parsed / ValueError if it uses anything other
+                 than the supported syntax or divides by a constant zero / TypeError on non-int literals
+        """
+        self.source = source
+        self._initial = []      # constant values, None for slots computed at evaluation time
+        self._variables = {}    # variable name -> slot
+        self._instructions = [] # (slot, operation, left slot, right slot) in evaluation order
+        self._nodes = {}        # node key -> slot, used to share identical subexpressions
+        self._root = self._compile(ast.parse(source.strip(), mode="eval").body)
+        del self._nodes
+
+    @property
+    def variables(self):
+        return tuple(self._variables)
+
+    @property
+    def operation_count(self):
+        """Number of operations performed by each evaluation, after folding and sharing"""
+        return len(self._instructions)
+
+    def _slot(self, key, value=None):
+        if key not in self._nodes:
+            self._nodes[key] = len(self._initial)
+            self._initial.append(value)
+        return self._nodes[key]
+
+    def _compile(self, node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) is not int:
+                raise TypeError("Expressions can only contain int constants")
+            return self._slot(("const", node.value, 1), (node.value, 1))
+        if isinstance(node, ast.Name):
+            slot = self._slot(("var", node.id))
+            self._variables[node.id] = slot
+            return slot
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self._compile(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            return self._operation("neg", operand, operand)
+        if isinstance(node, ast.BinOp) and type(node.op) in AST_OPERATORS:
+            return self._operation(AST_OPERATORS[type(node.op)], self._compile(node.left), self._compile(node.right))
+        raise ValueError(f"Unsupported syntax in expression: {ast.unparse(node)}")
+
+    def _operation(self, name, left, right):
+        left_value, right_value = self._initial[left], self._initial[right]
+        if left_value is not None and right_value is not None:
+            # Constant folding, the folded value is stored reduced
+            result = Fraction(*OPERATIONS[name](left_value, right_value))
+            value = (result.numerator, result.denominator)
+            return self._slot(("const",) + value, value)
+        if name in COMMUTATIVE and right < left:
+            left, right = right, left
+        key = (name, left, right)
+        if key not in self._nodes:
+            self._instructions.append((self._slot(key), name, left, right))
+        return self._nodes[key]
+
+    def evaluate(self, bindings=None, /, **kwargs):
+        """Evaluate the expression for one set of variable values
+
+        Values are given as a mapping, as keyword arguments, or both.
+
+        PRE : None
+        POST : returns a new instance of Fraction containing the value of the expression
+        RAISES : NameError if a variable is not bound / TypeError if a value is not an int or
+                 Fraction, or if an exponent is not an integer / ValueError on a division by 0
+        """
+        if kwargs:
+            bindings = dict(bindings or {}, **kwargs)
+        bindings = bindings or {}
+        values = self._initial.copy()
+        for name, slot in self._variables.items():
+            if name not in bindings:
+                raise NameError(f"Variable '{name}' is not bound")
+            values[slot] = _as_pair(bindings[name])
+        for slot, name, left, right in self._instructions:
+            values[slot] = OPERATIONS[name](values[left], values[right])
+        return Fraction(*values[self._root])
+
+    def evaluate_many(self, batch, processes=None, parallel_threshold=PARALLEL_THRESHOLD):
+        """Evaluate the expression for every set of variable values in batch
+
+        Batches of at least parallel_threshold bindings are spread over a process pool,
+        unless only one worker is available (processes defaults to the usable CPUs).
+
+        PRE : batch is an iterable of dicts mapping variable names to Fraction or int
+        POST : returns a list of Fraction, in the order of batch
+        RAISES : ValueError if processes < 1 / same as evaluate()
+        """
+        if processes is not None and processes < 1:
+            raise ValueError("The number of processes must be at least 1")
+        batch = list(batch)
+        workers = processes or _available_cpus()
+        if not batch or len(batch) < parallel_threshold or workers <= 1:
+            return [self.evaluate(bindings) for bindings in batch]
+        size = math.ceil(len(batch) / (workers * 4))
+        chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+        results = []
+        # processes=None lets the executor apply its own platform limits (61 workers on Windows)
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(self,)) as pool:
+            for chunk in pool.map(_evaluate_chunk, chunks):
+                results.extend(chunk)
+        return results
+
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str):
+    """Return the compiled Expression for source, reusing it if it was already compiled
+
+    PRE : None
+    POST : returns an instance of Expression
+    RAISES : same as Expression()
+    """
+    return Expression(source)
@@ -0,0 +1,261 @@
+"""Performance benchmarks for the Fraction class
+
+Measures the cost of construction, gcd, arithmetic, comparisons and __str__
+on small-int, big-int and mixed int/Fraction workloads, side by side with the
+standard library's fractions.Fraction, and reports the results as JSON.
+
+Usage :
+    python tp09_benchmark.py                          # print results as JSON
+    python tp09_benchmark.py -o baseline.json         # save results
+    python tp09_benchmark.py --baseline baseline.json --threshold 0.25
+        # exits with status 1 if a hot operation got more than 25% slower
+        # relative to fractions.Fraction, or is missing from either run
+"""
+import argparse
+import fractions
+import json
+import math
+import random
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+from tp07_fraction import Fraction
+
+WORKLOADS = ("small", "big", "mixed")
+IMPLEMENTATIONS = {"tp07": Fraction, "stdlib": fractions.Fraction}
+HOT_OPERATIONS = ("init", "add", "mul", "eq", "lt")
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_SEED = 2021
+DEFAULT_SIZE = 200
+# speedup_vs_stdlib is the median ratio of interleaved tp07/stdlib timing rounds,
+# so load changes during a run affect both sides, unlike raw ops/sec
+METRICS = ("speedup_vs_stdlib", "ops_per_sec")
+
+
+# Each operation receives the implementation class and two prepared operands.
+# In the "mixed" workload, b is a plain int.
+OPERATIONS = {
+    "init": lambda cls, a, b: cls(a.numerator, a.denominator),
+    # stdlib fractions has no gcd method, math.gcd is what it relies on
+    "gcd": lambda cls, a, b: a.gcd(a.numerator, a.denominator) if cls is Fraction else math.gcd(a.numerator, a.denominator),
+    "add": lambda cls, a, b: a + b,
+    "sub": lambda cls, a, b: a - b,
+    "mul": lambda cls, a, b: a * b,
+    "truediv": lambda cls, a, b: a / b,
+    "pow": lambda cls, a, b: a ** 3,
+    "eq": lambda cls, a, b: a == b,
+    "lt": lambda cls, a, b: a < b,
+    "str": lambda cls, a, b: str(a),
+}
+# Operations that ignore b, the "mixed" workload would only repeat "small" for them
+UNARY_OPERATIONS = ("init", "gcd", "pow", "str")
+
+
+def applies_to(workload, name):
+    """Return True if operation name is benchmarked in workload"""
+    return workload != "mixed" or name not in UNARY_OPERATIONS
+
+
+def random_pair(rng, workload):
+    """Return raw integer operands (a_num, a_den, b_num, b_den) for a workload
+
+    PRE : workload is one of WORKLOADS
+    POST : returns a tuple of ints, denominators and b are never zero. For the
+           "mixed" workload b_den is None, meaning b is the plain int b_num
+    """
+    bound = 10 ** 40 if workload == "big" else 1000
+    a_num = rng.randint(-bound, bound)
+    a_den = rng.choice((-1, 1)) * rng.randint(1, bound)
+    b_num = rng.choice((-1, 1)) * rng.randint(1, bound)
+    if workload == "mixed":
+        return a_num, a_den, b_num, None
+    b_den = rng.choice((-1, 1)) * rng.randint(1, bound)
+    return a_num, a_den, b_num, b_den
+
+
+def build_operands(cls, pairs):
+    """Turn raw integer pairs into operands of the given implementation
+
+    PRE : pairs has been generated by random_pair()
+    POST : returns a list of (a, b) tuples, b being an int for mixed pairs
+    """
+    operands = []
+    for a_num, a_den, b_num, b_den in pairs:
+        b = b_num if b_den is None else cls(b_num, b_den)
+        operands.append((cls(a_num, a_den), b))
+    return operands
+
+
+def measure_speed(op, operands, repeat=5):
+    """Time an operation on both implementations, alternating them within every round
+
+    PRE : operands maps every name of IMPLEMENTATIONS to a non-empty list built by build_operands()
+    POST : returns a tuple ({impl: best ops/sec over `repeat` rounds}, median of the
+           per-round tp07/stdlib ratios)
+    """
+    timers = {}
+    for impl, cls in IMPLEMENTATIONS.items():
+        def run(cls=cls, pairs=operands[impl]):
+            for a, b in pairs:
+                op(cls, a, b)
+        timer = timeit.Timer(run)
+        timers[impl] = (timer, timer.autorange()[0])
+
+    rates = {impl: [] for impl in IMPLEMENTATIONS}
+    ratios = []
+    for i in range(repeat):
+        # Swap which implementation goes first so neither always runs warmer
+        order = list(IMPLEMENTATIONS) if i % 2 == 0 else list(reversed(IMPLEMENTATIONS))
+        for impl in order:
+            timer, number = timers[impl]
+            rates[impl].append(len(operands[impl]) * number / timer.timeit(number))
+        ratios.append(rates["tp07"][-1] / rates["stdlib"][-1])
+    return {impl: max(r) for impl, r in rates.items()}, statistics.median(ratios)
+
+
+def measure_allocations(cls, op, operands):
+    """Return the memory allocated by one operation and the memory its result retains
+
+    The peak is measured around every single call, so temporaries freed before
+    the operation returns are accounted for. The retained figures only count
+    what is still alive afterwards, mostly the returned object itself.
+
+    PRE : operands is a non-empty list built by build_operands()
+    POST : returns a tuple (peak_bytes_per_op, retained_blocks_per_op, retained_bytes_per_op)
+    """
+    results = [None] * len(operands)
+    tracemalloc.start()
+    try:
+        peak = 0
+        for a, b in operands:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            op(cls, a, b)
+            peak += tracemalloc.get_traced_memory()[1] - start
+        before = tracemalloc.take_snapshot()
+        for i, (a, b) in enumerate(operands):
+            results[i] = op(cls, a, b)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    n = len(operands)
+    return peak / n, max(blocks, 0) / n, max(size, 0) / n
+
+
+def run_benchmarks(size=DEFAULT_SIZE, seed=DEFAULT_SEED, operations=None, workloads=WORKLOADS, repeat=5):
+    """Run every operation of every workload against both implementations
+
+    Operations in UNARY_OPERATIONS are left out of the "mixed" workload.
+
+    PRE : size > 0
+    POST : returns a dict {workload: {operation: {impl: metrics}}}, metrics
+           being a dict with ops_per_sec, peak_alloc_bytes_per_op, retained_blocks_per_op
+           and retained_bytes_per_op, plus the tp07/stdlib ratio speedup_vs_stdlib
+    """
+    operations = operations or list(OPERATIONS)
+    results = {}
+    for workload in workloads:
+        rng = random.Random(f"{seed}-{workload}")
+        pairs = [random_pair(rng, workload) for _ in range(size)]
+        results[workload] = {}
+        operands = {impl: build_operands(cls, pairs) for impl, cls in IMPLEMENTATIONS.items()}
+        for name in operations:
+            if not applies_to(workload, name):
+                continue
+            op = OPERATIONS[name]
+            rates, speedup = measure_speed(op, operands, repeat)
+            results[workload][name] = {}
+            for impl, cls in IMPLEMENTATIONS.items():
+                peak, blocks, nbytes = measure_allocations(cls, op, operands[impl])
+                results[workload][name][impl] = {
+                    "ops_per_sec": round(rates[impl], 1),
+                    "peak_alloc_bytes_per_op": round(peak, 1),
+                    "retained_blocks_per_op": round(blocks, 2),
+                    "retained_bytes_per_op": round(nbytes, 1),
+                }
+            results[workload][name]["speedup_vs_stdlib"] = round(speedup, 3)
+    return results
+
+
+def _metric(results, workload, name, metric):
+    try:
+        entry = results[workload][name]
+        return entry[metric] if metric == "speedup_vs_stdlib" else entry["tp07"][metric]
+    except KeyError:
+        return None
+
+
+def find_regressions(current, baseline, threshold=DEFAULT_THRESHOLD, operations=HOT_OPERATIONS,
+                     metric="speedup_vs_stdlib", workloads=None):
+    """Compare the tp07 performance of hot operations against a baseline
+
+    Only the given workloads are checked, by default every workload of either result set.
+
+    PRE : current and baseline come from run_benchmarks(), 0 <= threshold < 1, metric is one of METRICS
+    POST : returns a list of human readable messages, one per checked operation whose metric
+           dropped by more than `threshold` or which is missing from either result set
+           (empty if every checked operation was found and none regressed)
+    """
+    if workloads is None:
+        workloads = sorted(set(current) | set(baseline))
+    regressions = []
+    for workload in workloads:
+        for name in operations:
+            if not applies_to(workload, name):
+                continue
+            old = _metric(baseline, workload, name, metric)
+            new = _metric(current, workload, name, metric)
+            if old is None or new is None:
+                where = "baseline" if old is None else "current results"
+                regressions.append(f"{workload}/{name}: missing from {where}")
+            elif new < old * (1 - threshold):
+                regressions.append(
+                    f"{workload}/{name}: {metric} {new:g} vs {old:g} in baseline "
+                    f"({(1 - new / old):.0%} slower, threshold {threshold:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tp07 Fraction against fractions.Fraction")
+    parser.add_argument("-n", "--size", type=int, default=DEFAULT_SIZE, help="operand pairs per workload")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per measurement")
+    parser.add_argument("--ops", nargs="+", choices=list(OPERATIONS), help="operations to run (default: all)")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("-o", "--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="tolerated slowdown of a hot operation (default: %(default)s)")
+    parser.add_argument("--metric", choices=METRICS, default=METRICS[0],
+                        help="value compared against the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.size, args.seed, args.ops, args.workloads, args.repeat)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        checked = [name for name in HOT_OPERATIONS if name in (args.ops or OPERATIONS)]
+        regressions = find_regressions(results, baseline, args.threshold, checked, args.metric, args.workloads)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
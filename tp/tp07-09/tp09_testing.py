@@ -1,4 +1,14 @@
+import fractions
+import json
+import math
+import os
+import random
+import re
+import tempfile
 import unittest
+from unittest import mock
+import tp09_benchmark
+from tp07_expression import REDUCE_BITS, Expression, compile_expression
 from tp07_fraction import Fraction
 
 class FractionTestCase(unittest.TestCase):
@@ -260,6 +270,222 @@ class FractionTestCase(unittest.TestCase):
         with self.assertRaises(TypeError):
             f1.is_adjacent_to(4.2)
 
+
+class FractionDifferentialTestCase(unittest.TestCase):
+    """Randomized comparison of Fraction against the standard library's fractions.Fraction"""
+    SEED = 2021
+    ROUNDS = 500
+
+    def setUp(self):
+        self.rng = random.Random(self.SEED)
+
+    def random_pairs(self, bound, nonzero=False):
+        """Yield (tp07 Fraction, stdlib Fraction) pairs representing the same random value"""
+        for _ in range(self.ROUNDS):
+            num = self.rng.randint(-bound, bound)
+            if nonzero and not num:
+                num = 1
+            den = self.rng.choice((-1, 1)) * self.rng.randint(1, bound)
+            yield Fraction(num, den), fractions.Fraction(num, den)
+
+    def assertSameFraction(self, mine, reference):
+        self.assertEqual((mine.numerator, mine.denominator), (reference.numerator, reference.denominator))
+
+    def test_differential_init_and_str(self):
+        """Verifying reduced form and string format match the standard library"""
+        for bound in (1000, 10 ** 40):
+            for mine, reference in self.random_pairs(bound):
+                self.assertSameFraction(mine, reference)
+                self.assertEqual(str(mine), str(reference))
+
+    def test_differential_gcd(self):
+        """Verifying gcd() matches math.gcd"""
+        f = Fraction(1, 1)
+        for _ in range(self.ROUNDS):
+            n, d = self.rng.randint(-10 ** 30, 10 ** 30), self.rng.randint(-10 ** 30, 10 ** 30)
+            self.assertEqual(f.gcd(n, d), math.gcd(n, d))
+
+    def test_differential_arithmetic(self):
+        """Verifying +, -, *, / and ** match the standard library with Fraction and int operands"""
+        for bound in (1000, 10 ** 40):
+            for (a, ref_a), (b, ref_b) in zip(self.random_pairs(bound), self.random_pairs(bound, nonzero=True)):
+                n = self.rng.randint(-bound, bound) or 1
+                self.assertSameFraction(a + b, ref_a + ref_b)
+                self.assertSameFraction(a - b, ref_a - ref_b)
+                self.assertSameFraction(a * b, ref_a * ref_b)
+                self.assertSameFraction(a / b, ref_a / ref_b)
+                self.assertSameFraction(a + n, ref_a + n)
+                self.assertSameFraction(a - n, ref_a - n)
+                self.assertSameFraction(a * n, ref_a * n)
+                self.assertSameFraction(a / n, ref_a / n)
+                exponent = self.rng.randint(-4, 4)
+                self.assertSameFraction(b ** exponent, ref_b ** exponent)
+
+    def test_differential_comparisons(self):
+        """Verifying ==, !=, <, <=, > and >= match the standard library"""
+        for bound in (10, 1000, 10 ** 40):
+            for (a, ref_a), (b, ref_b) in zip(self.random_pairs(bound), self.random_pairs(bound)):
+                n = self.rng.randint(-bound, bound)
+                for other, ref_other in ((b, ref_b), (a, ref_a), (n, n)):
+                    self.assertEqual(a == other, ref_a == ref_other)
+                    self.assertEqual(a != other, ref_a != ref_other)
+                    self.assertEqual(a < other, ref_a < ref_other)
+                    self.assertEqual(a <= other, ref_a <= ref_other)
+                    self.assertEqual(a > other, ref_a > ref_other)
+                    self.assertEqual(a >= other, ref_a >= ref_other)
+
+class RegressionCheckTestCase(unittest.TestCase):
+    """Verifying the benchmark regression check on hand-written results"""
+
+    def results(self, speedup, ops_per_sec=1000.0, operations=tp09_benchmark.HOT_OPERATIONS, workloads=("small",)):
+        return {workload: {
+            name: {"tp07": {"ops_per_sec": ops_per_sec}, "stdlib": {"ops_per_sec": 1000.0}, "speedup_vs_stdlib": speedup}
+            for name in operations if tp09_benchmark.applies_to(workload, name)
+        } for workload in workloads}
+
+    def test_under_threshold(self):
+        """Verifying no regression is reported within the threshold"""
+        baseline = self.results(1.0)
+        self.assertEqual(tp09_benchmark.find_regressions(self.results(1.0), baseline, 0.2), [])
+        self.assertEqual(tp09_benchmark.find_regressions(self.results(0.85), baseline, 0.2), [])
+        self.assertEqual(tp09_benchmark.find_regressions(self.results(1.5), baseline, 0.2), [])
+
+    def test_over_threshold(self):
+        """Verifying slowdowns beyond the threshold are reported for every hot operation"""
+        regressions = tp09_benchmark.find_regressions(self.results(0.7), self.results(1.0), 0.2)
+        self.assertEqual(len(regressions), len(tp09_benchmark.HOT_OPERATIONS))
+        self.assertIn("small/add", " ".join(regressions))
+
+    def test_metric(self):
+        """Verifying the speedup ratio is compared by default and raw ops/sec on demand"""
+        # Whole machine twice as slow: stdlib slowed down too, the ratio did not change
+        current, baseline = self.results(1.0, ops_per_sec=500.0), self.results(1.0)
+        self.assertEqual(tp09_benchmark.find_regressions(current, baseline, 0.2), [])
+        self.assertTrue(tp09_benchmark.find_regressions(current, baseline, 0.2, metric="ops_per_sec"))
+
+    def test_missing(self):
+        """Verifying missing hot operations and workloads are reported instead of skipped"""
+        current = self.results(1.0, operations=("str",))
+        regressions = tp09_benchmark.find_regressions(current, self.results(1.0), 0.2)
+        self.assertEqual(len(regressions), len(tp09_benchmark.HOT_OPERATIONS))
+        self.assertIn("small/init: missing from current results", regressions)
+        baseline = {"big": self.results(1.0)["small"]}
+        regressions = tp09_benchmark.find_regressions(self.results(1.0), baseline, 0.2)
+        self.assertIn("big/add: missing from current results", regressions)
+        self.assertIn("small/add: missing from baseline", regressions)
+        # Unary operations are not run on the mixed workload, so they cannot be missing from it
+        full = self.results(1.0, workloads=tp09_benchmark.WORKLOADS)
+        self.assertNotIn("init", full["mixed"])
+        self.assertEqual(tp09_benchmark.find_regressions(full, full, 0.2), [])
+
+    def test_subset(self):
+        """Verifying a run of some operations and workloads is only checked on those"""
+        full = self.results(1.0, workloads=tp09_benchmark.WORKLOADS)
+        current = self.results(1.0, operations=("add",))
+        self.assertEqual(tp09_benchmark.find_regressions(current, full, 0.2, ("add",), workloads=["small"]), [])
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_path = os.path.join(tmp, "baseline.json")
+            with open(baseline_path, "w") as f:
+                json.dump(full, f)
+            argv = ["--ops", "add", "str", "--workloads", "small", "-o", os.path.join(tmp, "out.json"),
+                    "--baseline", baseline_path]
+            with mock.patch.object(tp09_benchmark, "run_benchmarks", return_value=current):
+                self.assertEqual(tp09_benchmark.main(argv), 0)
+            with mock.patch.object(tp09_benchmark, "run_benchmarks", return_value=self.results(0.5, operations=("add",))), \
+                    mock.patch("sys.stderr"):
+                self.assertEqual(tp09_benchmark.main(argv), 1)
+
+    def test_main_exit_status(self):
+        """Verifying main() returns 1 on a regression and 0 otherwise"""
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_path, output_path = os.path.join(tmp, "baseline.json"), os.path.join(tmp, "out.json")
+            with open(baseline_path, "w") as f:
+                json.dump(self.results(1.0), f)
+            argv = ["--workloads", "small", "-o", output_path, "--baseline", baseline_path]
+            with mock.patch.object(tp09_benchmark, "run_benchmarks", return_value=self.results(0.5)), \
+                    mock.patch("sys.stderr"):
+                self.assertEqual(tp09_benchmark.main(argv), 1)
+            with mock.patch.object(tp09_benchmark, "run_benchmarks", return_value=self.results(0.95)):
+                self.assertEqual(tp09_benchmark.main(argv), 0)
+            with open(output_path) as f:
+                self.assertEqual(json.load(f), self.results(0.95))
+
+class ExpressionTestCase(unittest.TestCase):
+    def test_evaluate(self):
+        """Verifying expression evaluation and operator precedence"""
+        e = Expression("3/4 * x + 1/2 ** 3")
+        self.assertEqual(e.variables, ("x",))
+        self.assertEqual(e.evaluate(x=Fraction(2, 3)), Fraction(5, 8))
+        self.assertEqual(e.evaluate({"x": 2}), Fraction(13, 8))
+        e = Expression("-(x - y) / (x * y) ** -2")
+        self.assertEqual(e.evaluate(x=Fraction(1, 2), y=3), Fraction(45, 8))
+        self.assertEqual(e.evaluate({"x": Fraction(1, 2)}, y=3), Fraction(45, 8))
+        # Variables may share their name with the parameters of evaluate()
+        self.assertEqual(Expression("bindings + self").evaluate(bindings=2, self=3), Fraction(5, 1))
+
+    def test_constant_folding(self):
+        """Verifying constant subexpressions are computed once, at compile time"""
+        e = Expression("(1 + 2) * 4 / 6 - 2 ** -1")
+        self.assertEqual(e.operation_count, 0)
+        self.assertEqual(e.evaluate(), Fraction(3, 2))
+        self.assertEqual(Expression("x * (3/4 + 1/4)").operation_count, 1)
+
+    def test_common_subexpressions(self):
+        """Verifying identical subexpressions are only computed once"""
+        e = Expression("(x + y) * (y + x) - (x + y) / 2")
+        self.assertEqual(e.operation_count, 4)
+        self.assertEqual(e.evaluate(x=1, y=Fraction(1, 2)), Fraction(3, 2))
+
+    def test_evaluate_errors(self):
+        """Verifying errors raised while compiling and evaluating expressions"""
+        self.assertRaises(SyntaxError, Expression, "x +")
+        self.assertRaises(ValueError, Expression, "x % 2")
+        self.assertRaises(ValueError, Expression, "f(x)")
+        self.assertRaises(ValueError, Expression, "1 / (2 - 2)")
+        self.assertRaises(TypeError, Expression, "x * 1.5")
+        e = Expression("1 / x ** y")
+        self.assertRaises(NameError, e.evaluate, x=2)
+        self.assertRaises(TypeError, e.evaluate, x=2.0, y=1)
+        self.assertRaises(TypeError, e.evaluate, x=2, y=Fraction(1, 2))
+        self.assertRaises(ValueError, e.evaluate, x=0, y=1)
+
+    def test_evaluate_many(self):
+        """Verifying batch evaluation, sequential and on a process pool"""
+        e = compile_expression("x ** 2 - x / y")
+        self.assertIs(e, compile_expression("x ** 2 - x / y"))
+        batch = [{"x": Fraction(i, 7), "y": i % 5 + 1} for i in range(50)]
+        expected = [b["x"] ** 2 - b["x"] / b["y"] for b in batch]
+        self.assertEqual(e.evaluate_many(batch), expected)
+        self.assertEqual(e.evaluate_many(batch, processes=2, parallel_threshold=10), expected)
+        self.assertEqual(e.evaluate_many([], parallel_threshold=0), [])
+        self.assertRaises(ValueError, e.evaluate_many, batch, processes=0)
+
+    def test_differential_evaluate(self):
+        """Verifying compiled evaluation matches operator by operator evaluation with fractions.Fraction"""
+        rng = random.Random(2021)
+        sources = (
+            "3/4 * x + 1/2 ** 3",
+            "(x + y) * (y + x) - (x + y) / 2 + -x ** 2",
+            "x ** -3 - y ** 2 * x / (y * y + 1)",
+            "x ** 100 / (y + 1/3)",
+            "(x * y) ** 60 / (y ** 61 + 1/7) - x ** 40",
+        )
+        widest = 0
+        for source in sources:
+            e = Expression(source)
+            # int literals are made Fractions too, so that 3/4 is not computed as a float
+            reference = re.sub(r"\d+", lambda m: f"F({m.group()})", source)
+            for _ in range(100):
+                values = {"x": (rng.randint(-10 ** 6, 10 ** 6) or 1, rng.randint(1, 10 ** 6)),
+                          "y": (rng.randint(-10 ** 6, 10 ** 6), rng.randint(1, 10 ** 6))}
+                expected = eval(reference, {"F": fractions.Fraction},
+                                {name: fractions.Fraction(*value) for name, value in values.items()})
+                result = e.evaluate({name: Fraction(*value) for name, value in values.items()})
+                self.assertEqual((result.numerator, result.denominator), (expected.numerator, expected.denominator))
+                widest = max(widest, expected.denominator.bit_length())
+        # Some intermediate results went through the reduction of oversized pairs
+        self.assertGreater(widest, REDUCE_BITS)
+
 if __name__ == "__main__":
     unittest.main()
 